@@ -7,7 +7,15 @@ __version__ = "0.1.0"
 __author__ = "Kholoud Ibrahim"
 __email__ = "thmanabrahym512@gmail.com"
 
-from .database import init_db, Transaction, Category
-from .cli import main
-
 __all__ = ['init_db', 'Transaction', 'Category', 'main']
+
+
+def __getattr__(name):
+    """Import the public names lazily so `import finance_tracker` stays cheap"""
+    if name == 'main':
+        from .cli import main
+        return main
+    if name in ('init_db', 'Transaction', 'Category'):
+        from . import database
+        return getattr(database, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,91 +2,165 @@
 Personal Finance Tracker CLI
 Main command-line interface module
 """
-import click
-from rich.console import Console
-from rich.table import Table
-from rich import box
 from datetime import datetime
-from .database import init_db, Transaction, Category
-from .reports import generate_summary, generate_chart
+from functools import lru_cache, wraps
+
+import click
+
+from .database import Category, Transaction, db, get_category_id, init_db, to_cents
+
+# (header, style, justify) for each table column
+_TX_COLUMNS = [
+    ("ID", "cyan", "right"),
+    ("Date", "magenta", None),
+    ("Description", "white", None),
+    ("Category", "blue", None),
+    ("Type", "yellow", None),
+    ("Amount", "green", "right"),
+]
+_CATEGORY_COLUMNS = [
+    ("Category", "cyan", None),
+    ("Amount", "red", "right"),
+    ("Percentage", "yellow", "right"),
+]
+
+
+class TransactionType(click.ParamType):
+    """Exact-match choice of transaction types, checked against a frozenset"""
+    name = "type"
+    
+    def __init__(self, *choices):
+        self.choices = choices
+        self._valid = frozenset(choices)
+    
+    def get_metavar(self, param, ctx=None):
+        return f"[{'|'.join(self.choices)}]"
+    
+    def convert(self, value, param, ctx):
+        if value in self._valid:
+            return value
+        self.fail(f"{value!r} is not one of {', '.join(self.choices)}.", param, ctx)
+    
+    def shell_complete(self, ctx, param, incomplete):
+        from click.shell_completion import CompletionItem
+        return [CompletionItem(c) for c in self.choices if c.startswith(incomplete)]
+
+
+@lru_cache(maxsize=None)
+def _get_console():
+    """Return the shared console, created on first use"""
+    from rich.console import Console
+    # Output is explicitly marked up, so skip the auto-highlighting regexes
+    return Console(highlight=False, log_time=False, log_path=False)
+
 
-console = Console()
+def _make_table(title, box_name, columns):
+    """Build a rich table with the given column schema"""
+    from rich import box
+    from rich.table import Table
+    
+    table = Table(title=title, box=getattr(box, box_name), highlight=False)
+    for header, style, justify in columns:
+        table.add_column(header, style=style, justify=justify or "left")
+    return table
+
+
+def with_db(f):
+    """Initialize the database before a command runs, after its options parse"""
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        import sys
+        
+        if not getattr(sys, '_called_from_test', False):
+            init_db()
+        return f(*args, **kwargs)
+    return wrapper
 
 
 @click.group()
 @click.version_option(version="0.1.0")
 def main():
     """Personal Finance Tracker - Manage your income and expenses"""
-    import sys
-    
-    if not getattr(sys, '_called_from_test', False):
-        init_db()
 
 
 @main.command()
 @click.option('--amount', '-a', type=float, required=True, help='Transaction amount')
 @click.option('--description', '-d', required=True, help='Transaction description')
 @click.option('--category', '-c', required=True, help='Category (e.g., food, transport, salary)')
-@click.option('--type', '-t', 'trans_type', type=click.Choice(['income', 'expense']), 
+@click.option('--type', '-t', 'trans_type', type=TransactionType('income', 'expense'),
               required=True, help='Transaction type')
-@click.option('--date', type=click.DateTime(formats=["%Y-%m-%d"]), 
-              default=str(datetime.now().date()), help='Transaction date (YYYY-MM-DD)')
+@click.option('--date', type=click.DateTime(formats=["%Y-%m-%d"]),
+              # Evaluated per command; a REPL session can outlive the day it started
+              default=lambda: str(datetime.now().date()),
+              help='Transaction date (YYYY-MM-DD)')
+@with_db
 def add(amount, description, category, trans_type, date):
     """Add a new transaction"""
+    console = _get_console()
+    
+    cents = to_cents(amount)
     try:
-        cat, created = Category.get_or_create(name=category.lower())
-        
-        transaction = Transaction.create(
-            amount=amount,
-            description=description,
-            category=cat,
-            transaction_type=trans_type,
-            date=date
-        )
+        with db.atomic():
+            Transaction.create(
+                amount=cents,
+                description=description,
+                category=get_category_id(category.lower()),
+                transaction_type=trans_type,
+                date=date
+            )
         
-        console.print(f"[green]✓[/green] Added {trans_type}: {description} - ${amount:.2f}", 
+        console.print(f"[green]✓[/green] Added {trans_type}: {description} - ${cents / 100:.2f}",
                      style="bold")
         
     except Exception as e:
+        # A rolled-back insert may have taken a freshly cached category with it
+        get_category_id.cache_clear()
         console.print(f"[red]Error:[/red] {str(e)}")
 
 
 @main.command()
 @click.option('--limit', '-l', default=10, help='Number of transactions to show')
-@click.option('--type', '-t', 'trans_type', type=click.Choice(['income', 'expense', 'all']), 
+@click.option('--type', '-t', 'trans_type',
+              type=TransactionType('income', 'expense', 'all'),
               default='all', help='Filter by transaction type')
+@with_db
 def list(limit, trans_type):
     """List recent transactions"""
+    console = _get_console()
+    
     try:
-        query = Transaction.select().order_by(Transaction.date.desc()).limit(limit)
+        # Plain dict rows joined with their category; no model instances needed
+        query = (Transaction
+                 .select(Transaction.id, Transaction.date, Transaction.description,
+                         Category.name.alias('category'), Transaction.transaction_type,
+                         Transaction.amount)
+                 .join(Category)
+                 .order_by(Transaction.date.desc())
+                 .limit(limit)
+                 .dicts())
         
         if trans_type != 'all':
             query = query.where(Transaction.transaction_type == trans_type)
         
-        transactions = [t for t in query]  
+        transactions = [t for t in query]
         
         if not transactions:
             console.print("[yellow]No transactions found[/yellow]")
             return
         
-        table = Table(title=f"Recent Transactions ({trans_type})", box=box.ROUNDED)
-        table.add_column("ID", style="cyan", justify="right")
-        table.add_column("Date", style="magenta")
-        table.add_column("Description", style="white")
-        table.add_column("Category", style="blue")
-        table.add_column("Type", style="yellow")
-        table.add_column("Amount", justify="right", style="green")
+        table = _make_table(f"Recent Transactions ({trans_type})", "ROUNDED",
+                            _TX_COLUMNS)
         
         for trans in transactions:
-            amount_str = f"${trans.amount:.2f}"
-            color = "green" if trans.transaction_type == "income" else "red"
+            amount_str = f"${trans['amount'] / 100:.2f}"
+            color = "green" if trans['transaction_type'] == "income" else "red"
             
             table.add_row(
-                str(trans.id),
-                trans.date.strftime("%Y-%m-%d"),
-                trans.description,
-                trans.category.name,
-                trans.transaction_type,
+                str(trans['id']),
+                trans['date'].strftime("%Y-%m-%d"),
+                trans['description'],
+                trans['category'],
+                trans['transaction_type'],
                 f"[{color}]{amount_str}[/{color}]"
             )
         
@@ -99,8 +173,13 @@ def list(limit, trans_type):
 @main.command()
 @click.option('--month', '-m', type=int, help='Month (1-12)')
 @click.option('--year', '-y', type=int, help='Year')
+@with_db
 def summary(month, year):
     """Show financial summary"""
+    from .reports import generate_summary
+    
+    console = _get_console()
+    
     try:
         current_date = datetime.now()
         month = month or current_date.month
@@ -118,10 +197,7 @@ def summary(month, year):
         console.print(f"[{balance_color}]Net Balance:[/{balance_color}]   ${balance:.2f}\n")
         
         if summary_data['by_category']:
-            table = Table(title="Expenses by Category", box=box.SIMPLE)
-            table.add_column("Category", style="cyan")
-            table.add_column("Amount", justify="right", style="red")
-            table.add_column("Percentage", justify="right", style="yellow")
+            table = _make_table("Expenses by Category", "SIMPLE", _CATEGORY_COLUMNS)
             
             for cat_data in summary_data['by_category']:
                 table.add_row(
@@ -140,8 +216,13 @@ def summary(month, year):
 @click.option('--month', '-m', type=int, help='Month (1-12)')
 @click.option('--year', '-y', type=int, help='Year')
 @click.option('--output', '-o', default='chart.png', help='Output filename')
+@with_db
 def chart(month, year, output):
     """Generate expense chart"""
+    from .reports import generate_chart
+    
+    console = _get_console()
+    
     try:
         current_date = datetime.now()
         month = month or current_date.month
@@ -156,8 +237,11 @@ def chart(month, year, output):
 
 @main.command()
 @click.argument('transaction_id', type=int)
+@with_db
 def delete(transaction_id):
     """Delete a transaction by ID"""
+    console = _get_console()
+    
     try:
         transaction = Transaction.get_by_id(transaction_id)
         description = transaction.description
@@ -172,29 +256,64 @@ def delete(transaction_id):
 
 @main.command()
 @click.option('--output', '-o', default='export.csv', help='Output CSV file')
+@with_db
 def export(output):
     """Export all transactions to CSV"""
+    console = _get_console()
+    
     try:
-        import pandas as pd
+        import csv
         
-        transactions = Transaction.select()
-        data = [{
-            'id': t.id,
-            'date': t.date,
-            'description': t.description,
-            'category': t.category.name,
-            'type': t.transaction_type,
-            'amount': t.amount
-        } for t in transactions]
+        # Stream joined rows straight from the cursor; no model instances or FK lookups
+        rows = (Transaction
+                .select(Transaction.id, Transaction.date, Transaction.description,
+                        Category.name, Transaction.transaction_type, Transaction.amount)
+                .join(Category)
+                .order_by(Transaction.id)
+                .tuples()
+                .iterator())
         
-        df = pd.DataFrame(data)
-        df.to_csv(output, index=False)
+        count = 0
+        with open(output, 'w', newline='', buffering=1 << 20) as f:
+            writer = csv.writer(f)
+            writer.writerow(['id', 'date', 'description', 'category', 'type', 'amount'])
+            for trans_id, date, description, category, trans_type, amount in rows:
+                writer.writerow([trans_id, date, description, category, trans_type,
+                                 f"{amount / 100:.2f}"])
+                count += 1
         
-        console.print(f"[green]✓[/green] Exported {len(data)} transactions to: {output}")
+        console.print(f"[green]✓[/green] Exported {count} transactions to: {output}")
         
     except Exception as e:
         console.print(f"[red]Error:[/red] {str(e)}")
 
 
+@main.command()
+def repl():
+    """Run several commands in one session"""
+    import shlex
+    
+    console = _get_console()
+    console.print("Type a command (e.g. list -l 5), or 'exit' to quit")
+    
+    while True:
+        try:
+            line = input("finance> ").strip()
+        except (EOFError, KeyboardInterrupt):
+            break
+        
+        if line in ('exit', 'quit'):
+            break
+        if not line:
+            continue
+        
+        try:
+            main.main(shlex.split(line), prog_name="finance", standalone_mode=False)
+        except click.ClickException as e:
+            e.show()
+        except (click.Abort, ValueError) as e:
+            console.print(f"[red]Error:[/red] {str(e)}")
+
+
 if __name__ == '__main__':
     main()
@@ -4,11 +4,35 @@ Uses Peewee ORM with SQLite
 """
 from peewee import *
 from datetime import datetime
+from decimal import ROUND_HALF_UP, Decimal
+from functools import lru_cache
+import atexit
 import os
+import sqlite3
 
 # Database file location
 DB_PATH = os.path.join(os.path.expanduser('~'), '.finance_tracker.db')
-db = SqliteDatabase(DB_PATH)
+
+# Bumped whenever stored data needs migrating; tracked in PRAGMA user_version
+SCHEMA_VERSION = 1
+
+# INSERT ... RETURNING needs SQLite 3.35+
+HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# Rows per multi-row statement. SQLite before 3.32 allows only 999 bound
+# parameters, and a transaction row binds six.
+BATCH_SIZE = 100
+
+# Path init_db last ran against; a REPL session runs many commands per process
+_initialized_db = None
+
+db = SqliteDatabase(DB_PATH, pragmas={
+    'journal_mode': 'wal',
+    'synchronous': 1,  # NORMAL is safe under WAL and avoids an fsync per commit
+    'cache_size': -64000,  # 64MB page cache
+    'foreign_keys': 1,
+    'mmap_size': 268435456,  # Map up to 256MB of the file instead of read() calls
+})
 
 
 class BaseModel(Model):
@@ -31,7 +55,7 @@ class Category(BaseModel):
 
 class Transaction(BaseModel):
     """Transaction model for income and expenses"""
-    amount = DecimalField(max_digits=10, decimal_places=2)
+    amount = IntegerField()  # Stored in cents
     description = CharField()
     category = ForeignKeyField(Category, backref='transactions')
     transaction_type = CharField(choices=[('income', 'Income'), ('expense', 'Expense')])
@@ -42,28 +66,131 @@ class Transaction(BaseModel):
         table_name = 'transactions'
         indexes = (
             (('date', 'transaction_type'), False),
+            # Serves "WHERE transaction_type = ? ORDER BY date DESC" in list
+            (('transaction_type', 'date'), False),
         )
     
     def __str__(self):
-        return f"{self.date} - {self.description}: ${self.amount}"
+        return f"{self.date} - {self.description}: ${self.amount / 100:.2f}"
 
 
 def init_db():
-    """Initialize database and create tables safely"""
+    """Initialize database and create tables safely, once per database path"""
+    global _initialized_db
+    if _initialized_db == db.database and not db.is_closed():
+        return
+    
+    get_category_id.cache_clear()
     if db.is_closed():
         db.connect()
+    had_tables = Transaction.table_exists()
     db.create_tables([Category, Transaction], safe=True)
     
+    with db.atomic():
+        _migrate(had_tables)
+    
     # Default categories
     default_categories = [
         'salary', 'freelance', 'investment',  # Income
         'food', 'transport', 'rent', 'utilities', 'entertainment', 'shopping', 'other'  # Expense
     ]
     
-    for cat_name in default_categories:
-        Category.get_or_create(name=cat_name)
+    # Seed only on first run; later runs skip straight past this
+    if Category.select().count() == 0:
+        with db.atomic():
+            Category.insert_many(
+                [{'name': name} for name in default_categories]
+            ).on_conflict_ignore().execute()
     
-    db.close()
+    # The connection stays open for the commands that follow; see close_db.
+    _initialized_db = db.database
+
+
+def _migrate(had_tables):
+    """Bring an existing database up to SCHEMA_VERSION"""
+    version = db.pragma('user_version')
+    
+    if had_tables and version < 1:
+        # Amounts used to be stored as decimal dollars
+        db.execute_sql(
+            'UPDATE transactions SET amount = CAST(ROUND(amount * 100) AS INTEGER)'
+        )
+    
+    if version < SCHEMA_VERSION:
+        db.pragma('user_version', SCHEMA_VERSION)
+
+
+def to_cents(amount):
+    """Convert a dollar amount to whole cents, rounding half a cent up"""
+    # Go through the decimal text so 12.345 is not seen as 12.3449999...
+    cents = Decimal(str(amount)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+    return int(cents * 100)
+
+
+@lru_cache(maxsize=128)
+def get_category_id(name):
+    """Return the id of a category by name, creating it if needed"""
+    if HAS_RETURNING:
+        # The no-op update makes RETURNING yield the id of an existing row too
+        query = (Category
+                 .insert(name=name)
+                 .on_conflict(conflict_target=[Category.name],
+                              update={Category.name: Category.name})
+                 .returning(Category.id)
+                 .tuples())
+        return list(query.execute())[0][0]
+    
+    row = Category.select(Category.id).where(Category.name == name).tuples().first()
+    if row:
+        return row[0]
+    return Category.insert(name=name).execute()
+
+
+def _category_ids(names):
+    """Map category names to ids, creating any that are missing"""
+    ids = {}
+    for batch in chunked(sorted({name.lower() for name in names}), BATCH_SIZE):
+        Category.insert_many(
+            [{'name': name} for name in batch]
+        ).on_conflict_ignore().execute()
+        query = (Category
+                 .select(Category.name, Category.id)
+                 .where(Category.name.in_(batch)))
+        ids.update(query.tuples())
+    return ids
+
+
+def add_many(rows):
+    """
+    Insert many transactions in a single transaction
+    
+    Args:
+        rows: Iterable of dicts with 'amount' (dollars), 'description',
+              'category' (name), 'type' and an optional 'date'
+    
+    Returns:
+        Number of transactions inserted
+    """
+    rows = list(rows)
+    if not rows:
+        return 0
+    
+    now = datetime.now()
+    with db.atomic():
+        category_ids = _category_ids(row['category'] for row in rows)
+        payload = [{
+            'amount': to_cents(row['amount']),
+            'description': row['description'],
+            'category': category_ids[row['category'].lower()],
+            'transaction_type': row['type'],
+            'date': row.get('date', now),
+            'created_at': now
+        } for row in rows]
+        
+        for batch in chunked(payload, BATCH_SIZE):
+            Transaction.insert_many(batch).execute()
+    
+    return len(payload)
 
 
 def get_db():
@@ -76,4 +203,10 @@ def get_db():
 def close_db():
     """Close database connection"""
     if not db.is_closed():
+        # SQLite picks the tables to analyze from the queries this connection
+        # ran, so refreshing planner statistics only works just before closing
+        db.execute_sql('PRAGMA optimize')
         db.close()
+
+
+atexit.register(close_db)
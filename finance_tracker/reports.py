@@ -3,8 +3,14 @@ Reports and data visualization module
 """
 from .database import Transaction, Category
 from peewee import fn
-import matplotlib.pyplot as plt
-from datetime import datetime
+from datetime import date
+
+
+def _month_bounds(month, year):
+    """Return the half-open [start, end) date range covering a month"""
+    start = date(year, month, 1)
+    end = date(year + (month == 12), month % 12 + 1, 1)
+    return start, end
 
 
 def generate_summary(month, year):
@@ -18,23 +24,28 @@ def generate_summary(month, year):
     Returns:
         Dictionary with summary data
     """
-    # Query transactions for the specified month using SQLite strftime
-    transactions = Transaction.select().where(
-        (fn.strftime('%m', Transaction.date) == f"{month:02d}") &
-        (fn.strftime('%Y', Transaction.date) == str(year))
-    )
+    # Aggregate per category and type in SQL so only one row per group comes back.
+    # A plain range on the date column lets SQLite use the (date, type) index.
+    start, end = _month_bounds(month, year)
+    totals = (Transaction
+              .select(Category.name, Transaction.transaction_type,
+                      fn.SUM(Transaction.amount).alias('total'))
+              .join(Category)
+              .where((Transaction.date >= start) & (Transaction.date < end))
+              .group_by(Category.name, Transaction.transaction_type)
+              .tuples())
     
     total_income = 0
     total_expense = 0
     expenses_by_category = {}
     
-    for trans in transactions:
-        if trans.transaction_type == 'income':
-            total_income += float(trans.amount)
+    for cat_name, trans_type, total in totals:
+        total /= 100  # cents to dollars
+        if trans_type == 'income':
+            total_income += total
         else:
-            total_expense += float(trans.amount)
-            cat_name = trans.category.name
-            expenses_by_category[cat_name] = expenses_by_category.get(cat_name, 0) + float(trans.amount)
+            total_expense += total
+            expenses_by_category[cat_name] = total
     
     # Calculate percentages
     category_data = []
@@ -60,7 +71,10 @@ def generate_chart(month, year, output_file='chart.png'):
     Args:
         month: Month number (1-12)
         year: Year (e.g., 2024)
-        output_file: Output filename for the chart
+        output_file: Output filename for the chart, or None to skip saving
+    
+    Returns:
+        The matplotlib Figure, or None if there is no expense data
     """
     summary = generate_summary(month, year)
     
@@ -68,29 +82,40 @@ def generate_chart(month, year, output_file='chart.png'):
         print("No expense data to visualize")
         return
     
+    # Imported here so the CLI and summaries never pay matplotlib's import cost.
+    # The OO API with the Agg canvas avoids pyplot's global figure manager.
+    from matplotlib import colormaps
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    
     # Prepare data for pie chart
     categories = [item['category'] for item in summary['by_category']]
     amounts = [item['amount'] for item in summary['by_category']]
     
     # Create pie chart
-    plt.figure(figsize=(10, 8))
-    colors = plt.cm.Set3.colors
+    fig = Figure(figsize=(10, 8))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    colors = colormaps['Set3'].colors
     explode = [0.05 if i == 0 else 0 for i in range(len(categories))]
     
-    plt.pie(amounts, labels=categories, autopct='%1.1f%%', startangle=90,
-            colors=colors, explode=explode, shadow=True)
+    ax.pie(amounts, labels=categories, autopct='%1.1f%%', startangle=90,
+           colors=colors, explode=explode, shadow=True)
     
-    plt.title(f'Expenses by Category - {month}/{year}', fontsize=16, fontweight='bold')
-    plt.axis('equal')
+    ax.set_title(f'Expenses by Category - {month}/{year}',
+                 fontsize=16, fontweight='bold')
+    ax.axis('equal')
     
     # Add summary text
     total_expense = summary['total_expense']
-    plt.text(0, -1.3, f'Total Expenses: ${total_expense:.2f}', 
-             ha='center', fontsize=12, bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5))
-    
-    plt.tight_layout()
-    plt.savefig(output_file, dpi=300, bbox_inches='tight')
-    plt.close()
+    ax.text(0, -1.3, f'Total Expenses: ${total_expense:.2f}',
+            ha='center', fontsize=12,
+            bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5))
+    
+    fig.tight_layout()
+    if output_file is not None:
+        fig.savefig(output_file, dpi=150, bbox_inches='tight')
+    return fig
 
 
 def get_monthly_trend(year):
@@ -105,15 +130,17 @@ def get_monthly_trend(year):
     """
     monthly_data = {month: {'income': 0, 'expense': 0} for month in range(1, 13)}
     
-    transactions = Transaction.select().where(
-        fn.strftime('%Y', Transaction.date) == str(year)
-    )
+    rows = (Transaction
+            .select(Transaction.date, Transaction.transaction_type, Transaction.amount)
+            .where((Transaction.date >= date(year, 1, 1)) &
+                   (Transaction.date < date(year + 1, 1, 1)))
+            .tuples()
+            .iterator())
     
-    for trans in transactions:
-        month = trans.date.month
-        if trans.transaction_type == 'income':
-            monthly_data[month]['income'] += float(trans.amount)
+    for trans_date, trans_type, amount in rows:
+        if trans_type == 'income':
+            monthly_data[trans_date.month]['income'] += amount / 100
         else:
-            monthly_data[month]['expense'] += float(trans.amount)
+            monthly_data[trans_date.month]['expense'] += amount / 100
     
     return monthly_data
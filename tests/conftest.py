@@ -1,13 +1,71 @@
 import pytest
 import sys
-from finance_tracker.database import db, init_db
+from click.testing import CliRunner
+from datetime import datetime
+from finance_tracker.database import (
+    db, get_category_id, to_cents, Category, Transaction
+)
 
 sys._called_from_test = True
 
+
+def _create_memory_db():
+    """Point the models at a fresh in-memory database with the schema created"""
+    db.init(':memory:')
+    db.connect()
+    # Nothing here needs to survive a crash, so skip journaling and locking work
+    for pragma in ('journal_mode=MEMORY', 'synchronous=OFF', 'temp_store=MEMORY',
+                   'locking_mode=EXCLUSIVE', 'cache_size=-64000'):
+        db.execute_sql(f'PRAGMA {pragma}')
+    db.create_tables([Category, Transaction])
+    # Ids cached against the previous database mean nothing here
+    get_category_id.cache_clear()
+
+
 @pytest.fixture(scope='session', autouse=True)
 def setup_test_db():
-    """Initialize in-memory database for testing"""
-    db.init(':memory:')  
-    init_db()
-    yield
+    """Initialize in-memory database for testing, once per session"""
+    _create_memory_db()
+    yield db
     db.close()
+
+
+@pytest.fixture(scope='session')
+def runner():
+    """Create a CLI runner for testing; it holds no state between invocations"""
+    return CliRunner()
+
+
+@pytest.fixture(scope='function')
+def test_db(setup_test_db):
+    """Run a test inside a transaction that is rolled back afterwards"""
+    with db.atomic() as txn:
+        yield db
+        txn.rollback()
+    # Categories created by the test were rolled back along with their ids
+    get_category_id.cache_clear()
+
+
+@pytest.fixture(scope='function')
+def seed(test_db):
+    """Return a helper that stores a transaction directly, bypassing the CLI"""
+    def _seed(amount, description, category, trans_type, date=None):
+        # A plain INSERT skips model construction; returns the new row id
+        return Transaction.insert(
+            amount=to_cents(amount),
+            description=description,
+            category=get_category_id(category),
+            transaction_type=trans_type,
+            date=date or datetime.now()
+        ).execute()
+    return _seed
+
+
+@pytest.fixture(scope='function')
+def file_db(tmp_path):
+    """Use a throwaway database file, for tests that reconnect or run init_db"""
+    db.init(str(tmp_path / 'finance.db'))
+    yield db
+    db.close()
+    _create_memory_db()
+
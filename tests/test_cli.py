@@ -3,44 +3,32 @@ Tests for CLI commands
 Run with: poetry run pytest tests/test_cli.py -v
 """
 import pytest
-from click.testing import CliRunner
+from finance_tracker import database
 from finance_tracker.cli import main
-from finance_tracker.database import db, Category, Transaction
-import os
+from finance_tracker.database import db, get_category_id, Category, Transaction
+import subprocess
+import sys
+from pathlib import Path
 
+REPO_ROOT = Path(__file__).resolve().parents[1]
 
-@pytest.fixture(scope="function")
-def runner():
-    """Create a CLI runner for testing"""
-    return CliRunner()
+
+@pytest.fixture(scope="module")
+def default_categories(setup_test_db):
+    """Seed default categories once per module, rolled back at module teardown"""
+    names = ['salary', 'food', 'transport', 'utilities', 'other']
+    with db.atomic() as txn:
+        Category.insert_many(
+            [{'name': n} for n in names]
+        ).on_conflict_ignore().execute()
+        yield names
+        txn.rollback()
 
 
 @pytest.fixture(scope="function")
-def test_db():
-    """Create a test database"""
-    # Use a temporary test database
-    test_db_path = '/tmp/test_finance.db'
-    
-    # Remove if exists
-    if os.path.exists(test_db_path):
-        os.remove(test_db_path)
-    
-    # Initialize test database
-    db.init(test_db_path)
-    db.connect()
-    db.create_tables([Category, Transaction])
-    
-    # Create default categories
-    default_categories = ['salary', 'food', 'transport', 'utilities', 'other']
-    for cat_name in default_categories:
-        Category.get_or_create(name=cat_name)
-    
-    yield db
-    
-    # Cleanup
-    db.close()
-    if os.path.exists(test_db_path):
-        os.remove(test_db_path)
+def test_db(default_categories, test_db):
+    """Shared test database with the default categories already in place"""
+    return test_db
 
 
 def test_cli_help(runner):
@@ -59,57 +47,82 @@ def test_cli_version(runner):
     assert '0.1.0' in result.output
 
 
-def test_add_expense(runner, test_db):
-    """Test adding an expense transaction"""
-    result = runner.invoke(main, [
-        'add',
-        '-a', '50.00',
-        '-d', 'Test groceries',
-        '-c', 'food',
-        '-t', 'expense'
-    ])
+@pytest.mark.parametrize("cli_args", [None, ['--help'], ['--version']],
+                         ids=['import', 'help', 'version'])
+def test_cli_startup_skips_heavy_dependencies(cli_args):
+    """Test that importing the CLI or asking for help does not load heavy modules"""
+    code = "import sys; from finance_tracker.cli import main; "
+    if cli_args:
+        code += f"main({cli_args!r}, standalone_mode=False); "
+    code += "print(sorted(m for m in ('matplotlib', 'rich.table') if m in sys.modules))"
+    # Run from the repository root so the package imports wherever pytest starts
+    result = subprocess.run([sys.executable, '-c', code], cwd=REPO_ROOT,
+                            capture_output=True, text=True)
     
-    assert result.exit_code == 0
-    assert 'Added expense' in result.output or '✓' in result.output
-    
-    # Verify transaction was created
-    transactions = Transaction.select()
-    assert len(list(transactions)) > 0
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.splitlines()[-1] == '[]'
 
 
-def test_add_income(runner, test_db):
-    """Test adding an income transaction"""
-    result = runner.invoke(main, [
-        'add',
-        '-a', '2000.00',
-        '-d', 'Monthly salary',
-        '-c', 'salary',
-        '-t', 'income'
-    ])
-    
-    assert result.exit_code == 0
-    assert 'income' in result.output.lower() or '✓' in result.output
+@pytest.mark.parametrize("cli_args,calls", [
+    (['add', '--help'], 0),
+    (['list', '--help'], 0),
+    (['list'], 1),
+], ids=['add_help', 'list_help', 'list'])
+def test_database_initialized_only_by_commands(runner, test_db, monkeypatch,
+                                               cli_args, calls):
+    """Test that subcommand help never touches the database file"""
+    init_calls = []
+    monkeypatch.setattr(sys, '_called_from_test', False)
+    monkeypatch.setattr('finance_tracker.cli.init_db', lambda: init_calls.append(1))
 
+    result = runner.invoke(main, cli_args)
 
-def test_add_with_date(runner, test_db):
-    """Test adding transaction with specific date"""
-    result = runner.invoke(main, [
-        'add',
-        '-a', '30.00',
-        '-d', 'Bus pass',
-        '-c', 'transport',
-        '-t', 'expense',
-        '--date', '2024-11-01'
-    ])
+    assert result.exit_code == 0
+    assert len(init_calls) == calls
+
+
+@pytest.mark.parametrize("args,expected,stored_date", [
+    (['-a', '50.00', '-d', 'Test groceries', '-c', 'food', '-t', 'expense'],
+     'Added expense: Test groceries - $50.00', None),
+    (['-a', '2000.00', '-d', 'Monthly salary', '-c', 'salary', '-t', 'income'],
+     'Added income: Monthly salary - $2000.00', None),
+    (['-a', '30.00', '-d', 'Bus pass', '-c', 'transport', '-t', 'expense',
+      '--date', '2024-11-01'],
+     'Added expense: Bus pass - $30.00', '2024-11-01'),
+], ids=['expense', 'income', 'with_date'])
+def test_add_transaction(runner, test_db, args, expected, stored_date):
+    """Test adding transactions from the command line"""
+    result = runner.invoke(main, ['add', *args])
+    
+    assert result.exit_code == 0
+    assert expected in result.output
+    
+    # Verify transaction was created
+    assert Transaction.select().count() == 1
+    if stored_date:
+        assert Transaction.get().date.isoformat() == stored_date
+
+
+@pytest.mark.parametrize("amount,cents,shown", [
+    ('12.345', 1235, '$12.35'),
+    ('0.005', 1, '$0.01'),
+    ('1.005', 101, '$1.01'),
+], ids=['half_cent', 'under_a_cent', 'float_below_half'])
+def test_add_rounds_half_cents_up(runner, test_db, amount, cents, shown):
+    """Test that the confirmation shows exactly the amount that was stored"""
+    result = runner.invoke(main, ['add', '-a', amount, '-d', 'x', '-c', 'food',
+                                  '-t', 'expense'])
     
     assert result.exit_code == 0
+    assert f'Added expense: x - {shown}' in result.output
+    assert Transaction.get().amount == cents
 
 
-def test_list_transactions(runner, test_db):
+def test_list_transactions(runner, test_db, seed):
     """Test listing transactions"""
     # First add some transactions
-    runner.invoke(main, ['add', '-a', '50', '-d', 'Lunch', '-c', 'food', '-t', 'expense'])
-    runner.invoke(main, ['add', '-a', '100', '-d', 'Dinner', '-c', 'food', '-t', 'expense'])
+    seed(50, 'Lunch', 'food', 'expense')
+    seed(100, 'Dinner', 'food', 'expense')
     
     # Now list them
     result = runner.invoke(main, ['list'])
@@ -117,36 +130,39 @@ def test_list_transactions(runner, test_db):
     assert result.exit_code == 0
     # Should show transactions in output
     assert 'Lunch' in result.output or 'Dinner' in result.output or 'food' in result.output
+    assert '$50.00' in result.output
 
 
 def test_list_with_limit(runner, test_db):
     """Test listing with limit parameter"""
-    # Add multiple transactions
-    for i in range(5):
-        runner.invoke(main, [
-            'add', '-a', '10', '-d', f'Test {i}', '-c', 'food', '-t', 'expense'
-        ])
+    # Add multiple transactions in one statement
+    food_id = get_category_id('food')
+    Transaction.insert_many([
+        {'amount': 1000, 'description': f'Test {i}', 'category': food_id,
+         'transaction_type': 'expense'}
+        for i in range(5)
+    ]).execute()
     
     result = runner.invoke(main, ['list', '--limit', '3'])
     assert result.exit_code == 0
 
 
-def test_list_filter_by_type(runner, test_db):
+def test_list_filter_by_type(runner, test_db, seed):
     """Test filtering transactions by type"""
     # Add income and expense
-    runner.invoke(main, ['add', '-a', '1000', '-d', 'Salary', '-c', 'salary', '-t', 'income'])
-    runner.invoke(main, ['add', '-a', '50', '-d', 'Food', '-c', 'food', '-t', 'expense'])
+    seed(1000, 'Salary', 'salary', 'income')
+    seed(50, 'Food', 'food', 'expense')
     
     # List only expenses
     result = runner.invoke(main, ['list', '--type', 'expense'])
     assert result.exit_code == 0
 
 
-def test_summary_command(runner, test_db):
+def test_summary_command(runner, test_db, seed):
     """Test summary command"""
     # Add some transactions
-    runner.invoke(main, ['add', '-a', '2000', '-d', 'Salary', '-c', 'salary', '-t', 'income'])
-    runner.invoke(main, ['add', '-a', '100', '-d', 'Food', '-c', 'food', '-t', 'expense'])
+    seed(2000, 'Salary', 'salary', 'income')
+    seed(100, 'Food', 'food', 'expense')
     
     result = runner.invoke(main, ['summary'])
     
@@ -155,39 +171,41 @@ def test_summary_command(runner, test_db):
     assert 'Income' in result.output or 'Expense' in result.output or 'Balance' in result.output
 
 
-def test_export_command(runner, test_db):
+def test_export_command(runner, test_db, seed, tmp_path):
     """Test export to CSV"""
+    output = tmp_path / "export.csv"
+    
     # Add a transaction
-    runner.invoke(main, ['add', '-a', '50', '-d', 'Test', '-c', 'food', '-t', 'expense'])
+    seed(50, 'Test', 'food', 'expense')
     
     # Export
-    result = runner.invoke(main, ['export', '--output', '/tmp/test_export.csv'])
+    result = runner.invoke(main, ['export', '--output', str(output)])
     
     assert result.exit_code == 0
     assert 'Exported' in result.output or '✓' in result.output
     
     # Check file was created
-    assert os.path.exists('/tmp/test_export.csv')
-    
-    # Cleanup
-    os.remove('/tmp/test_export.csv')
+    lines = output.read_text().splitlines()
+    assert lines[0] == 'id,date,description,category,type,amount'
+    assert lines[1].endswith(',Test,food,expense,50.00')
 
 
-def test_delete_command(runner, test_db):
+def test_delete_command(runner, test_db, seed):
     """Test deleting a transaction"""
     # Add a transaction
-    runner.invoke(main, ['add', '-a', '50', '-d', 'To Delete', '-c', 'food', '-t', 'expense'])
+    seed(50, 'To Delete', 'food', 'expense')
     
     # Get the transaction ID
-    transactions = Transaction.select()
-    if len(list(transactions)) > 0:
-        trans_id = list(transactions)[0].id
-        
-        # Delete it
-        result = runner.invoke(main, ['delete', str(trans_id)])
-        
-        # Should succeed (exit code 0) or show error message gracefully
-        assert result.exit_code == 0 or 'Error' in result.output
+    t = Transaction.select().first()
+    assert t is not None
+    trans_id = t.id
+    
+    # Delete it
+    result = runner.invoke(main, ['delete', str(trans_id)])
+    
+    assert result.exit_code == 0
+    assert 'Deleted transaction: To Delete' in result.output
+    assert not Transaction.select().exists()
 
 
 def test_invalid_transaction_type(runner, test_db):
@@ -202,6 +220,7 @@ def test_invalid_transaction_type(runner, test_db):
     
     # Should fail with non-zero exit code
     assert result.exit_code != 0
+    assert "'invalid_type' is not one of income, expense" in result.output
 
 
 def test_missing_required_fields(runner, test_db):
@@ -212,21 +231,99 @@ def test_missing_required_fields(runner, test_db):
     assert result.exit_code != 0
 
 
-def test_chart_generation(runner, test_db):
+def test_chart_generation(runner, test_db, seed, tmp_path):
     """Test chart generation command"""
+    output = tmp_path / "chart.png"
+    
     # Add some expense data
-    runner.invoke(main, ['add', '-a', '100', '-d', 'Food', '-c', 'food', '-t', 'expense'])
-    runner.invoke(main, ['add', '-a', '50', '-d', 'Transport', '-c', 'transport', '-t', 'expense'])
+    seed(100, 'Food', 'food', 'expense')
+    seed(50, 'Transport', 'transport', 'expense')
     
     # Generate chart
-    result = runner.invoke(main, ['chart', '--output', '/tmp/test_chart.png'])
+    result = runner.invoke(main, ['chart', '--output', str(output)])
     
     # Should complete without error
     assert result.exit_code == 0
+    assert output.exists()
+
+
+def test_repl_runs_multiple_commands(runner, test_db):
+    """Test that the REPL dispatches several commands in one session"""
+    result = runner.invoke(main, ['repl'], input=(
+        "add -a 5 -d Tea -c food -t expense\n"
+        "add -t bogus\n"
+        "list\n"
+        "exit\n"
+    ))
+    
+    assert result.exit_code == 0
+    assert 'Added expense: Tea' in result.output
+    assert "Error: Invalid value for '--type' / '-t': 'bogus'" in result.output
+    assert 'Recent Transactions' in result.output
+    assert Transaction.select().count() == 1
+
+
+def test_repl_dates_adds_by_current_day(runner, test_db, monkeypatch):
+    """Test that a session left open past midnight dates new adds by the new day"""
+    from datetime import datetime
+    
+    class Clock(datetime):
+        ticks = iter([datetime(2024, 11, 30, 23, 59), datetime(2024, 12, 1, 0, 1)])
+        
+        @classmethod
+        def now(cls, tz=None):
+            return next(cls.ticks)
+    
+    monkeypatch.setattr('finance_tracker.cli.datetime', Clock)
+    
+    result = runner.invoke(main, ['repl'], input=(
+        "add -a 5 -d Tea -c food -t expense\n"
+        "add -a 3 -d Coffee -c food -t expense\n"
+        "exit\n"
+    ))
+    
+    assert result.exit_code == 0
+    dates = {t.description: t.date.isoformat() for t in Transaction.select()}
+    assert dates == {'Tea': '2024-11-30', 'Coffee': '2024-12-01'}
+
+
+def test_repl_initializes_database_once(runner, test_db, monkeypatch):
+    """Test that a REPL session runs the schema setup for its first command only"""
+    migrations = []
+    migrate = database._migrate
+    monkeypatch.setattr(sys, '_called_from_test', False)
+    monkeypatch.setattr(database, '_initialized_db', None)
+    monkeypatch.setattr(database, '_migrate',
+                        lambda had_tables: migrations.append(migrate(had_tables)))
+
+    result = runner.invoke(main, ['repl'], input=(
+        "add -a 5 -d Tea -c food -t expense\n"
+        "add -a 3 -d Coffee -c food -t expense\n"
+        "list\n"
+        "exit\n"
+    ))
     
-    # Cleanup if file was created
-    if os.path.exists('/tmp/test_chart.png'):
-        os.remove('/tmp/test_chart.png')
+    assert result.exit_code == 0
+    assert len(migrations) == 1
+    assert Transaction.select().count() == 2
+
+
+def test_repl_reuses_cached_category_ids(runner, test_db):
+    """Test that repeated adds in one session look each category up only once"""
+    get_category_id.cache_clear()
+
+    result = runner.invoke(main, ['repl'], input=(
+        "add -a 5 -d Tea -c food -t expense\n"
+        "add -a 3 -d Coffee -c Food -t expense\n"
+        "add -a 8 -d Cake -c food -t expense\n"
+        "exit\n"
+    ))
+    
+    assert result.exit_code == 0
+    assert get_category_id.cache_info().misses == 1
+    assert get_category_id.cache_info().hits == 2
+    assert Transaction.select().where(
+        Transaction.category == Category.get(name='food')).count() == 3
 
 
 if __name__ == '__main__':
@@ -4,19 +4,11 @@ Run with: poetry run pytest
 """
 import pytest
 from datetime import datetime
-from finance_tracker.database import init_db, Transaction, Category, db
-
-
-@pytest.fixture(scope="function")
-def test_db():
-    """Create a test database"""
-    # Use in-memory database for tests
-    db.init(':memory:')
-    db.create_tables([Category, Transaction])
-    
-    yield db
-    
-    db.close()
+from finance_tracker import database
+from finance_tracker.cli import main
+from finance_tracker.database import (
+    init_db, add_many, close_db, get_category_id, Transaction, Category, db
+)
 
 
 def test_category_creation(test_db):
@@ -41,7 +33,7 @@ def test_transaction_creation(test_db):
     category = Category.create(name="salary")
     
     transaction = Transaction.create(
-        amount=1000.00,
+        amount=100000,  # cents
         description="Monthly salary",
         category=category,
         transaction_type="income",
@@ -49,7 +41,8 @@ def test_transaction_creation(test_db):
     )
     
     assert transaction.id is not None
-    assert float(transaction.amount) == 1000.00
+    assert transaction.amount == 100000
+    assert str(transaction).endswith("Monthly salary: $1000.00")
     assert transaction.description == "Monthly salary"
     assert transaction.category.name == "salary"
     assert transaction.transaction_type == "income"
@@ -97,7 +90,7 @@ def test_transaction_category_relationship(test_db):
     )
     
     # Category should have 2 transactions
-    assert len(list(category.transactions)) == 2
+    assert category.transactions.count() == 2
 
 
 def test_transaction_query(test_db):
@@ -114,8 +107,106 @@ def test_transaction_query(test_db):
         Transaction.transaction_type == "expense"
     )
     
-    assert len(list(expenses)) == 2
+    assert expenses.count() == 2
+
+
+@pytest.mark.parametrize("has_returning", [True, False])
+def test_get_category_id(test_db, monkeypatch, has_returning):
+    """Test resolving category ids, creating missing categories"""
+    monkeypatch.setattr(database, "HAS_RETURNING", has_returning)
+    # Look up an existing row that is not the most recently inserted one
+    food = Category.create(name="food")
+    Category.create(name="transport")
+    
+    assert get_category_id("food") == food.id
+    new_id = get_category_id("travel")
+    
+    assert Category.get_by_id(new_id).name == "travel"
+    # Repeat the lookup against the database, not the cache
+    get_category_id.cache_clear()
+    assert get_category_id("travel") == new_id
+    assert Category.select().count() == 3
+
+
+def test_add_many(test_db):
+    """Test bulk-inserting transactions with new and existing categories"""
+    Category.create(name="food")
+    
+    count = add_many([
+        {"amount": 12.5, "description": "Lunch", "category": "Food", "type": "expense"},
+        {"amount": 1000, "description": "Pay", "category": "salary", "type": "income",
+         "date": datetime(2024, 11, 1)},
+    ])
+    
+    assert count == 2
+    assert Category.select().count() == 2
+    lunch = Transaction.get(Transaction.description == "Lunch")
+    assert lunch.amount == 1250
+    assert lunch.category.name == "food"
+    pay = Transaction.get(Transaction.description == "Pay")
+    assert pay.date.isoformat() == "2024-11-01"
+
+
+def test_add_many_rounds_half_cents_up(test_db):
+    """Test that bulk inserts round half a cent the same way as the CLI"""
+    add_many([{"amount": 0.125, "description": "Gum", "category": "food",
+               "type": "expense"}])
+    
+    assert Transaction.get(Transaction.description == "Gum").amount == 13
+
+
+def test_add_many_spans_several_batches(test_db):
+    """Test that inserts larger than one batch keep every row and category"""
+    rows = [{"amount": 1, "description": f"Item {i}", "category": f"cat{i % 150}",
+             "type": "expense"} for i in range(database.BATCH_SIZE * 3 + 1)]
+
+    assert add_many(rows) == len(rows)
+    assert Transaction.select().count() == len(rows)
+    assert Category.select().count() == 150
+
+
+def test_init_db_seeds_default_categories_once(file_db):
+    """Test that default categories are seeded once and not duplicated"""
+    init_db()
+    # A fresh connection, as on the next run of the CLI
+    db.close()
+    init_db()
+    
+    assert Category.select().count() == 10
+    assert Category.select().where(Category.name == "salary").exists()
+
+
+def test_init_db_migrates_decimal_amounts_to_cents(file_db):
+    """Test that amounts stored as dollars are converted to cents once"""
+    db.create_tables([Category, Transaction])
+    category = Category.create(name="food")
+    db.execute_sql(
+        "INSERT INTO transactions (amount, description, category_id, "
+        "transaction_type, date, created_at) VALUES (12.34, 'Lunch', ?, "
+        "'expense', '2024-11-01', '2024-11-01 12:00:00')",
+        (category.id,)
+    )
+    
+    init_db()
+    db.close()
+    init_db()
+    
+    assert Transaction.get(Transaction.description == "Lunch").amount == 1234
 
 
+def test_planner_statistics_collected_on_close(runner, file_db):
+    """Test that PRAGMA optimize at close analyzes the tables a command queried"""
+    init_db()
+    add_many([{"amount": 1, "description": f"Item {i}", "category": "food",
+               "type": "income" if i % 5 == 0 else "expense"} for i in range(50)])
+    db.close()
+    
+    result = runner.invoke(main, ["list", "-t", "income"])
+    close_db()
+    
+    assert result.exit_code == 0
+    analyzed = db.execute_sql("SELECT DISTINCT tbl FROM sqlite_stat1").fetchall()
+    assert ("transactions",) in analyzed
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,131 @@
+"""
+Tests for reports and aggregation
+Run with: poetry run pytest tests/test_reports.py -v
+"""
+from datetime import datetime
+
+import pytest
+
+from finance_tracker.database import Category, Transaction, db
+from finance_tracker.reports import generate_chart, generate_summary, get_monthly_trend
+
+
+@pytest.fixture(scope="module")
+def sample_transactions(setup_test_db):
+    """Create sample transactions (amounts in cents), once per module"""
+    with db.atomic() as txn:
+        Category.insert_many(
+            [{"name": name} for name in ("food", "transport", "salary")]
+        ).execute()
+        ids = dict(Category.select(Category.name, Category.id).tuples())
+
+        Transaction.insert_many([
+            {"amount": 10000, "description": "Groceries", "category": ids["food"],
+             "transaction_type": "expense", "date": datetime(2024, 11, 15)},
+            {"amount": 5000, "description": "Restaurant", "category": ids["food"],
+             "transaction_type": "expense", "date": datetime(2024, 11, 20)},
+            {"amount": 5000, "description": "Bus pass", "category": ids["transport"],
+             "transaction_type": "expense", "date": datetime(2024, 11, 1)},
+            {"amount": 200000, "description": "Salary", "category": ids["salary"],
+             "transaction_type": "income", "date": datetime(2024, 11, 30)},
+            # Either side of a year boundary
+            {"amount": 4000, "description": "Dinner", "category": ids["food"],
+             "transaction_type": "expense", "date": datetime(2024, 12, 31)},
+            {"amount": 6000, "description": "Brunch", "category": ids["food"],
+             "transaction_type": "expense", "date": datetime(2025, 1, 1)},
+        ]).execute()
+
+        yield
+        txn.rollback()
+
+
+@pytest.fixture(scope="module")
+def summary_nov_2024(sample_transactions):
+    """Summary of the sample month, computed once per module"""
+    return generate_summary(11, 2024)
+
+
+@pytest.fixture(scope="module")
+def trend_2024(sample_transactions):
+    """Monthly trend of the sample year, computed once per module"""
+    return get_monthly_trend(2024)
+
+
+def test_summary_calculates_totals(summary_nov_2024):
+    """Test that income and expense totals are summed"""
+    assert summary_nov_2024['total_income'] == 2000
+    assert summary_nov_2024['total_expense'] == 200
+
+
+def test_summary_groups_by_category(summary_nov_2024):
+    """Test that expenses are grouped per category, largest first"""
+    assert summary_nov_2024['by_category'] == [
+        {'category': 'food', 'amount': 150, 'percentage': 75.0},
+        {'category': 'transport', 'amount': 50, 'percentage': 25.0},
+    ]
+
+
+def test_summary_empty_month(sample_transactions):
+    """Test that a month without transactions yields zeros"""
+    summary = generate_summary(10, 2024)
+
+    assert summary['total_income'] == 0
+    assert summary['total_expense'] == 0
+    assert summary['by_category'] == []
+
+
+@pytest.mark.parametrize("month,year,expected", [
+    (11, 2024, 200),
+    (12, 2024, 40),
+    (1, 2025, 60),
+], ids=["november", "december", "next_january"])
+def test_summary_filters_by_month(sample_transactions, month, year, expected):
+    """Test that each summary only counts its own month"""
+    assert generate_summary(month, year)['total_expense'] == expected
+
+
+def test_monthly_trend(trend_2024):
+    """Test that yearly trend buckets transactions by month"""
+    assert trend_2024[11] == {'income': 2000, 'expense': 200}
+    assert trend_2024[10] == {'income': 0, 'expense': 0}
+
+
+def test_monthly_trend_excludes_other_years(sample_transactions, test_db):
+    """Test that transactions from other years are left out of the trend"""
+    Transaction.create(amount=1000, description="Snack",
+                       category=Category.get(name="food"),
+                       transaction_type="expense", date=datetime(2023, 11, 5))
+
+    assert get_monthly_trend(2024)[11]['expense'] == 200
+
+
+def test_chart_figure_has_wedge_per_category(sample_transactions):
+    """Test the chart contents without encoding or writing a PNG"""
+    from matplotlib.patches import Wedge
+
+    fig = generate_chart(11, 2024, None)
+
+    ax = fig.axes[0]
+    assert len([p for p in ax.patches if isinstance(p, Wedge)]) == 2
+    assert 'Total Expenses: $200.00' in [t.get_text() for t in ax.texts]
+
+
+@pytest.mark.parametrize("month,filename,exists", [
+    (10, "chart.png", False),
+    (11, "chart.png", True),
+    (11, "november_expenses.png", True),
+], ids=["no_data", "create", "custom_name"])
+def test_chart_output_file(sample_transactions, tmp_path, month, filename, exists):
+    """Test that a chart file is written only for months with expenses"""
+    output = tmp_path / filename
+
+    fig = generate_chart(month, 2024, str(output))
+
+    assert (fig is not None) == exists
+    assert output.exists() == exists
+    if exists:
+        assert output.stat().st_size > 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])